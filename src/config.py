@@ -2,29 +2,31 @@
 Configuration module - loads settings from environment variables.
 """
 import os
+import functools
 from dataclasses import dataclass
+from typing import Mapping
 from dotenv import load_dotenv
 
 load_dotenv()
 
 
-def _get_bool(key: str, default: bool = False) -> bool:
+def _get_bool(env: Mapping[str, str], key: str, default: bool = False) -> bool:
     """Parse boolean from env var (accepts true/false/1/0)."""
-    val = os.getenv(key, str(default)).lower()
+    val = env.get(key, str(default)).lower()
     return val in ("true", "1", "yes")
 
 
-def _get_int(key: str, default: int) -> int:
+def _get_int(env: Mapping[str, str], key: str, default: int) -> int:
     """Parse integer from env var."""
-    return int(os.getenv(key, str(default)))
+    return int(env.get(key, str(default)))
 
 
-def _get_int_list(key: str) -> list[int]:
-    """Parse comma-separated list of integers."""
-    val = os.getenv(key, "")
+def _get_int_set(env: Mapping[str, str], key: str) -> frozenset[int]:
+    """Parse comma-separated list of integers into a set (O(1) membership)."""
+    val = env.get(key, "")
     if not val.strip():
-        return []
-    return [int(x.strip()) for x in val.split(",") if x.strip()]
+        return frozenset()
+    return frozenset(int(x.strip()) for x in val.split(",") if x.strip())
 
 
 @dataclass(frozen=True)
@@ -49,20 +51,27 @@ class Config:
     sqlite_path: str
     
     # Admin IDs fallback
-    admin_ids: list[int]
+    admin_ids: frozenset[int]
 
 
+@functools.cache
 def load_config() -> Config:
-    """Load and validate configuration from environment."""
-    bot_token = os.getenv("BOT_TOKEN")
+    """
+    Load and validate configuration from environment.
+    Parsed once per process; repeat calls return the same instance.
+    """
+    # Snapshot the environment once instead of querying it per key
+    env = dict(os.environ)
+    
+    bot_token = env.get("BOT_TOKEN")
     if not bot_token:
         raise ValueError("BOT_TOKEN environment variable is required")
     
-    group_chat_id = os.getenv("GROUP_CHAT_ID")
+    group_chat_id = env.get("GROUP_CHAT_ID")
     if not group_chat_id:
         raise ValueError("GROUP_CHAT_ID environment variable is required")
     
-    invite_link = os.getenv("JOIN_REQUEST_INVITE_LINK")
+    invite_link = env.get("JOIN_REQUEST_INVITE_LINK")
     if not invite_link:
         raise ValueError("JOIN_REQUEST_INVITE_LINK environment variable is required")
     
@@ -70,14 +79,11 @@ def load_config() -> Config:
         bot_token=bot_token,
         group_chat_id=int(group_chat_id),
         join_request_invite_link=invite_link,
-        verify_ttl_seconds=_get_int("VERIFY_TTL_SECONDS", 300),
-        cooldown_seconds=_get_int("COOLDOWN_SECONDS", 600),
-        max_attempts=_get_int("MAX_ATTEMPTS", 3),
-        strict_mode=_get_bool("STRICT_MODE", False),
-        lockdown=_get_bool("LOCKDOWN", False),
-        sqlite_path=os.getenv("SQLITE_PATH", "./data/gatekeeper.sqlite"),
-        admin_ids=_get_int_list("ADMIN_IDS"),
+        verify_ttl_seconds=_get_int(env, "VERIFY_TTL_SECONDS", 300),
+        cooldown_seconds=_get_int(env, "COOLDOWN_SECONDS", 600),
+        max_attempts=_get_int(env, "MAX_ATTEMPTS", 3),
+        strict_mode=_get_bool(env, "STRICT_MODE", False),
+        lockdown=_get_bool(env, "LOCKDOWN", False),
+        sqlite_path=env.get("SQLITE_PATH", "./data/gatekeeper.sqlite"),
+        admin_ids=_get_int_set(env, "ADMIN_IDS"),
     )
-
-
-
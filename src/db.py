@@ -2,12 +2,130 @@
 Database module - SQLite persistence using aiosqlite.
 """
 import time
+import asyncio
+import logging
+import itertools
+import contextlib
 import aiosqlite
+from cachetools import TTLCache
 from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, Iterator
 
+logger = logging.getLogger(__name__)
 
-@dataclass
+# Connection tuning applied on every connect.
+# WAL lets readers run alongside the writer; NORMAL sync is safe under WAL
+# and skips the extra journal fsync on every commit.
+PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", "-20000"),  # ~20 MB page cache
+    ("busy_timeout", "5000"),  # ms to wait on a locked DB before SQLITE_BUSY
+    ("mmap_size", "268435456"),  # 256 MB
+    ("foreign_keys", "ON"),
+)
+
+# Statement cache size for the underlying sqlite3 connection (default 128).
+# SQL below is kept as module constants so every call passes the same
+# string object and hits the cache instead of being re-parsed.
+STATEMENT_CACHE_SIZE = 256
+
+# Max queued writes the writer task commits in one transaction
+WRITE_BATCH_SIZE = 32
+
+# Read-only connections serving SELECTs alongside the single writer (WAL)
+READ_POOL_SIZE = 4
+
+# Per-user language cache (set_language writes through, so TTL only bounds memory)
+LANGUAGE_CACHE_SIZE = 10_000
+LANGUAGE_CACHE_TTL_SECONDS = 300
+
+# Wall-clock seconds, refreshed by _clock_tick while a Database is connected.
+# Saves a time() call per query; staleness is bounded by CLOCK_TICK_SECONDS,
+# which is negligible for cooldown/TTL checks measured in minutes.
+CLOCK_TICK_SECONDS = 0.25
+_now_cached = int(time.time())
+
+
+async def _clock_tick() -> None:
+    """Refresh the cached clock until cancelled."""
+    global _now_cached
+    while True:
+        _now_cached = int(time.time())
+        await asyncio.sleep(CLOCK_TICK_SECONDS)
+
+
+# --- SQL statements ---
+
+SQL_GET_USER = "SELECT * FROM users WHERE user_id = ?"
+
+# DO UPDATE rewrites the existing row with the same values so RETURNING
+# yields it on conflict (unlike INSERT OR IGNORE, this is a real write)
+SQL_UPSERT_USER = """INSERT INTO users (user_id) VALUES (?)
+    ON CONFLICT(user_id) DO UPDATE SET user_id = excluded.user_id
+    RETURNING *"""
+
+SQL_SET_LANGUAGE = """INSERT INTO users (user_id, language) VALUES (?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET language = ?"""
+
+# Records agreement (if not already set) and verification in one write
+SQL_MARK_VERIFIED = """INSERT INTO users
+    (user_id, agreed_at, verified_at, attempts_count, attempts_window_start, cooldown_until)
+    VALUES (?, ?, ?, 0, NULL, NULL)
+    ON CONFLICT(user_id) DO UPDATE SET
+        verified_at = excluded.verified_at,
+        agreed_at = COALESCE(users.agreed_at, excluded.agreed_at),
+        attempts_count = 0,
+        attempts_window_start = NULL,
+        cooldown_until = NULL"""
+
+# In DO UPDATE, bare column names refer to the pre-update row,
+# so the new count is recomputed inside the cooldown CASE.
+SQL_INC_ATTEMPTS = """INSERT INTO users (user_id, attempts_count, attempts_window_start, cooldown_until)
+    VALUES (:user_id, 1, :now, CASE WHEN 1 >= :max_attempts THEN :cooldown_at END)
+    ON CONFLICT(user_id) DO UPDATE SET
+        attempts_window_start = CASE
+            WHEN attempts_window_start IS NULL OR :now - attempts_window_start > 600 THEN :now
+            ELSE attempts_window_start END,
+        attempts_count = CASE
+            WHEN attempts_window_start IS NULL OR :now - attempts_window_start > 600 THEN 1
+            ELSE attempts_count + 1 END,
+        cooldown_until = CASE
+            WHEN (CASE
+                WHEN attempts_window_start IS NULL OR :now - attempts_window_start > 600 THEN 1
+                ELSE attempts_count + 1 END) >= :max_attempts THEN :cooldown_at
+            ELSE NULL END
+    RETURNING attempts_count, cooldown_until"""
+
+SQL_GET_LANGUAGE = "SELECT language FROM users WHERE user_id = ?"
+
+SQL_GET_LANGUAGE_COOLDOWN = "SELECT language, cooldown_until FROM users WHERE user_id = ?"
+
+SQL_GET_JOIN_CONTEXT = "SELECT language, verified_at, cooldown_until FROM users WHERE user_id = ?"
+
+# Conditional reset: only fires if the cooldown is still set and has expired
+SQL_CLEAR_EXPIRED_COOLDOWN = """UPDATE users SET
+    attempts_count = 0,
+    attempts_window_start = NULL,
+    cooldown_until = NULL
+    WHERE user_id = ? AND cooldown_until <= ?"""
+
+SQL_SET_JOIN_REQUEST_TIME = """INSERT INTO users (user_id, last_join_request_at) VALUES (?, ?)
+    ON CONFLICT(user_id) DO UPDATE SET last_join_request_at = ?"""
+
+SQL_ALL_SETTINGS = "SELECT key, value FROM settings"
+
+SQL_SET_SETTING = """INSERT INTO settings (key, value) VALUES (?, ?)
+    ON CONFLICT(key) DO UPDATE SET value = ?"""
+
+SQL_COUNT_VERIFIED_SINCE = "SELECT COUNT(*) as cnt FROM users WHERE verified_at > ?"
+
+SQL_COUNT_USERS = "SELECT COUNT(*) as cnt FROM users"
+
+
+@dataclass(slots=True)
 class UserState:
     """User state from database."""
     user_id: int
@@ -25,18 +143,39 @@ class Database:
     
     def __init__(self, path: str):
         self.path = path
-        self._conn: aiosqlite.Connection | None = None
+        # One read-write connection for writes, a small read-only pool for SELECTs
+        self._rw: aiosqlite.Connection | None = None
+        self._ro: list[aiosqlite.Connection] = []
+        self._ro_cycle: Iterator[aiosqlite.Connection] | None = None
+        # Write-through copy of the settings table (single-process bot,
+        # so the cache is authoritative once loaded in connect())
+        self._settings_cache: dict[str, str] = {}
+        self._language_cache: TTLCache[int, str | None] = TTLCache(
+            maxsize=LANGUAGE_CACHE_SIZE, ttl=LANGUAGE_CACHE_TTL_SECONDS
+        )
+        # All writes are queued and flushed in batches by _writer_loop,
+        # the only code that touches _rw after connect()
+        self._write_queue: asyncio.Queue[tuple[str, Any, asyncio.Future]] = asyncio.Queue()
+        self._writer_task: asyncio.Task | None = None
+        self._clock_task: asyncio.Task | None = None
     
     async def connect(self) -> None:
         """Initialize database connection and create tables."""
         # Ensure directory exists
         Path(self.path).parent.mkdir(parents=True, exist_ok=True)
         
-        self._conn = await aiosqlite.connect(self.path)
-        self._conn.row_factory = aiosqlite.Row
+        self._rw = await aiosqlite.connect(
+            self.path, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        self._rw.row_factory = aiosqlite.Row
+        
+        # Apply performance PRAGMAs before touching any tables
+        await self._apply_pragmas(self._rw)
         
-        # Create tables
-        await self._conn.executescript("""
+        # Create tables (one transaction for all DDL)
+        await self._rw.executescript("""
+            BEGIN;
+            
             CREATE TABLE IF NOT EXISTS users (
                 user_id INTEGER PRIMARY KEY,
                 language TEXT NULL,
@@ -52,194 +191,271 @@ class Database:
                 key TEXT PRIMARY KEY,
                 value TEXT NOT NULL
             );
+            
+            -- Partial indexes: only rows that actually carry a timestamp
+            CREATE INDEX IF NOT EXISTS idx_users_verified_at
+                ON users(verified_at) WHERE verified_at IS NOT NULL;
+            
+            CREATE INDEX IF NOT EXISTS idx_users_cooldown
+                ON users(cooldown_until) WHERE cooldown_until IS NOT NULL;
+            
+            COMMIT;
         """)
         
         # Migration: add language column if missing (for existing databases)
         try:
-            await self._conn.execute("ALTER TABLE users ADD COLUMN language TEXT NULL")
-            await self._conn.commit()
+            await self._rw.execute("ALTER TABLE users ADD COLUMN language TEXT NULL")
+            await self._rw.commit()
         except Exception:
             pass  # Column already exists
         
-        await self._conn.commit()
+        await self._rw.commit()
+        
+        # Load settings into memory
+        async with self._rw.execute(SQL_ALL_SETTINGS) as cursor:
+            self._settings_cache = {row["key"]: row["value"] for row in await cursor.fetchall()}
+        
+        # Read-only pool (opened after the schema exists)
+        ro_uri = f"{Path(self.path).resolve().as_uri()}?mode=ro"
+        for _ in range(READ_POOL_SIZE):
+            conn = await aiosqlite.connect(
+                ro_uri, uri=True, cached_statements=STATEMENT_CACHE_SIZE
+            )
+            conn.row_factory = aiosqlite.Row
+            await self._apply_pragmas(conn)
+            self._ro.append(conn)
+        self._ro_cycle = itertools.cycle(self._ro)
+        
+        self._writer_task = asyncio.create_task(self._writer_loop())
+        self._clock_task = asyncio.create_task(_clock_tick())
     
     async def close(self) -> None:
-        """Close database connection."""
-        if self._conn:
-            await self._conn.close()
-            self._conn = None
+        """Flush pending writes and close database connection."""
+        if self._clock_task:
+            self._clock_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._clock_task
+            self._clock_task = None
+        
+        if self._writer_task:
+            await self._write_queue.join()
+            self._writer_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer_task
+            self._writer_task = None
+        
+        for conn in self._ro:
+            await conn.close()
+        self._ro = []
+        self._ro_cycle = None
+        
+        if self._rw:
+            await self._rw.close()
+            self._rw = None
+    
+    @staticmethod
+    async def _apply_pragmas(conn: aiosqlite.Connection) -> None:
+        """Apply PRAGMAS to a connection, warning if WAL could not be enabled."""
+        for name, value in PRAGMAS:
+            async with conn.execute(f"PRAGMA {name}={value}") as cursor:
+                row = await cursor.fetchone()
+            if name == "journal_mode" and (not row or row[0].lower() != "wal"):
+                logger.warning(f"Could not enable WAL mode (journal_mode={row[0] if row else None})")
+    
+    def _reader(self) -> aiosqlite.Connection:
+        """Next read-only connection (round-robin)."""
+        return next(self._ro_cycle)
+    
+    # --- Write queue ---
+    
+    async def _write(self, sql: str, params: Any) -> list[aiosqlite.Row]:
+        """
+        Queue a write statement for the writer task (batched commit)
+        and return any RETURNING rows once it is committed.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._write_queue.put((sql, params, future))
+        return await future
+    
+    async def _writer_loop(self) -> None:
+        """Drain the write queue, committing up to WRITE_BATCH_SIZE writes at a time."""
+        while True:
+            batch = [await self._write_queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._write_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            try:
+                await self._flush_writes(batch)
+            except Exception as e:
+                logger.error(f"Write batch of {len(batch)} failed: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    async def _flush_writes(self, batch: list[tuple[str, Any, asyncio.Future]]) -> None:
+        """Execute a batch of writes in one transaction and resolve their futures."""
+        results = []
+        await self._rw.execute("BEGIN IMMEDIATE")
+        try:
+            for sql, params, future in batch:
+                try:
+                    async with self._rw.execute(sql, params) as cursor:
+                        results.append((future, await cursor.fetchall(), None))
+                except Exception as e:
+                    # Errors like SQLITE_FULL or IOERR abort the whole transaction,
+                    # undoing earlier statements too: fail the entire batch then
+                    if not self._rw.in_transaction:
+                        raise
+                    # Otherwise only this statement was undone; the rest still commits
+                    results.append((future, None, e))
+            await self._rw.commit()
+        except BaseException:
+            with contextlib.suppress(Exception):
+                await self._rw.rollback()
+            raise
+        
+        for future, rows, error in results:
+            if future.done():
+                continue  # Caller was cancelled
+            if error:
+                future.set_exception(error)
+            else:
+                future.set_result(rows)
     
     # --- User operations ---
     
+    @staticmethod
+    def _row_to_user(row: aiosqlite.Row) -> UserState:
+        """Build UserState from a users row."""
+        # Handle missing language column in old DBs
+        lang = row["language"] if "language" in row.keys() else None
+        return UserState(
+            user_id=row["user_id"],
+            language=lang,
+            agreed_at=row["agreed_at"],
+            verified_at=row["verified_at"],
+            attempts_count=row["attempts_count"],
+            attempts_window_start=row["attempts_window_start"],
+            cooldown_until=row["cooldown_until"],
+            last_join_request_at=row["last_join_request_at"],
+        )
+    
     async def get_user(self, user_id: int) -> UserState | None:
         """Get user state by ID."""
-        async with self._conn.execute(
-            "SELECT * FROM users WHERE user_id = ?", (user_id,)
-        ) as cursor:
+        async with self._reader().execute(SQL_GET_USER, (user_id,)) as cursor:
             row = await cursor.fetchone()
-            if row:
-                # Handle missing language column in old DBs
-                lang = row["language"] if "language" in row.keys() else None
-                return UserState(
-                    user_id=row["user_id"],
-                    language=lang,
-                    agreed_at=row["agreed_at"],
-                    verified_at=row["verified_at"],
-                    attempts_count=row["attempts_count"],
-                    attempts_window_start=row["attempts_window_start"],
-                    cooldown_until=row["cooldown_until"],
-                    last_join_request_at=row["last_join_request_at"],
-                )
-            return None
+            return self._row_to_user(row) if row else None
     
     async def ensure_user(self, user_id: int) -> UserState:
         """Get user state, creating if doesn't exist."""
-        # Use INSERT OR IGNORE to handle race conditions
-        await self._conn.execute(
-            "INSERT OR IGNORE INTO users (user_id) VALUES (?)", (user_id,)
-        )
-        await self._conn.commit()
-        
-        # Now fetch the user (guaranteed to exist)
-        user = await self.get_user(user_id)
-        return user
+        rows = await self._write(SQL_UPSERT_USER, (user_id,))
+        return self._row_to_user(rows[0])
     
     async def get_language(self, user_id: int) -> str | None:
-        """Get user's selected language."""
-        user = await self.get_user(user_id)
-        return user.language if user else None
+        """Get user's selected language (cached per user)."""
+        try:
+            return self._language_cache[user_id]
+        except KeyError:
+            pass
+        async with self._reader().execute(SQL_GET_LANGUAGE, (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        # setdefault: don't clobber a set_language that landed during the read
+        return self._language_cache.setdefault(user_id, row["language"] if row else None)
     
     async def set_language(self, user_id: int, language: str) -> None:
         """Set user's language preference."""
-        await self._conn.execute(
-            """INSERT INTO users (user_id, language) VALUES (?, ?)
-               ON CONFLICT(user_id) DO UPDATE SET language = ?""",
-            (user_id, language, language)
-        )
-        await self._conn.commit()
-    
-    async def set_agreed(self, user_id: int) -> None:
-        """Mark user as agreed to rules."""
-        now = int(time.time())
-        await self._conn.execute(
-            """INSERT INTO users (user_id, agreed_at) VALUES (?, ?)
-               ON CONFLICT(user_id) DO UPDATE SET agreed_at = ?""",
-            (user_id, now, now)
-        )
-        await self._conn.commit()
+        await self._write(SQL_SET_LANGUAGE, (user_id, language, language))
+        self._language_cache[user_id] = language
     
-    async def set_verified(self, user_id: int) -> None:
-        """Mark user as verified (passed captcha)."""
-        now = int(time.time())
-        await self._conn.execute(
-            """UPDATE users SET 
-               verified_at = ?,
-               attempts_count = 0,
-               attempts_window_start = NULL,
-               cooldown_until = NULL
-               WHERE user_id = ?""",
-            (now, user_id)
-        )
-        await self._conn.commit()
+    async def mark_verified(self, user_id: int, agreed_at: int | None = None) -> None:
+        """
+        Mark user as verified (passed captcha) and agreed to rules.
+        Keeps an existing agreed_at; otherwise uses agreed_at or now.
+        """
+        now = _now_cached
+        await self._write(SQL_MARK_VERIFIED, (user_id, agreed_at or now, now))
     
     async def increment_attempts(self, user_id: int, max_attempts: int, cooldown_seconds: int) -> tuple[int, int | None]:
         """
         Increment failed attempts. Returns (new_count, cooldown_until if triggered).
         Resets window if > 10 minutes since last attempt.
+        Window reset, increment and cooldown decision run as one atomic UPSERT.
         """
-        now = int(time.time())
-        user = await self.ensure_user(user_id)
-        
-        # Reset window if stale (> 10 min since window start)
-        window_start = user.attempts_window_start
-        if window_start and (now - window_start) > 600:
-            window_start = None
-        
-        if window_start is None:
-            window_start = now
-            count = 1
-        else:
-            count = user.attempts_count + 1
-        
-        cooldown_until = None
-        if count >= max_attempts:
-            cooldown_until = now + cooldown_seconds
-        
-        await self._conn.execute(
-            """UPDATE users SET 
-               attempts_count = ?,
-               attempts_window_start = ?,
-               cooldown_until = ?
-               WHERE user_id = ?""",
-            (count, window_start, cooldown_until, user_id)
+        now = _now_cached
+        rows = await self._write(
+            SQL_INC_ATTEMPTS,
+            {
+                "user_id": user_id,
+                "now": now,
+                "max_attempts": max_attempts,
+                "cooldown_at": now + cooldown_seconds,
+            }
         )
-        await self._conn.commit()
-        
-        return count, cooldown_until
-    
-    async def reset_attempts(self, user_id: int) -> None:
-        """Reset attempt counter (after successful captcha or cooldown)."""
-        await self._conn.execute(
-            """UPDATE users SET 
-               attempts_count = 0,
-               attempts_window_start = NULL,
-               cooldown_until = NULL
-               WHERE user_id = ?""",
-            (user_id,)
-        )
-        await self._conn.commit()
+        row = rows[0]
+        return row["attempts_count"], row["cooldown_until"]
     
     async def set_join_request_time(self, user_id: int) -> None:
         """Record when user made a join request."""
-        now = int(time.time())
-        await self._conn.execute(
-            """INSERT INTO users (user_id, last_join_request_at) VALUES (?, ?)
-               ON CONFLICT(user_id) DO UPDATE SET last_join_request_at = ?""",
-            (user_id, now, now)
-        )
-        await self._conn.commit()
+        now = _now_cached
+        await self._write(SQL_SET_JOIN_REQUEST_TIME, (user_id, now, now))
     
-    async def is_verified_recently(self, user_id: int, ttl_seconds: int) -> bool:
-        """Check if user was verified within TTL."""
-        user = await self.get_user(user_id)
-        if not user or not user.verified_at:
-            return False
-        
-        now = int(time.time())
-        return (now - user.verified_at) <= ttl_seconds
+    async def get_join_context(
+        self, user_id: int, verify_ttl_seconds: int
+    ) -> tuple[str | None, bool, bool]:
+        """
+        Everything a join request needs in one read.
+        Returns (language, verified_recently, in_cooldown); an expired
+        cooldown is reset, as in the lobby.
+        """
+        async with self._reader().execute(SQL_GET_JOIN_CONTEXT, (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None, False, False
+        verified_at = row["verified_at"]
+        verified_recently = bool(verified_at) and (_now_cached - verified_at) <= verify_ttl_seconds
+        in_cooldown, _ = await self._cooldown_status(user_id, row["cooldown_until"])
+        return row["language"], verified_recently, in_cooldown
     
-    async def is_in_cooldown(self, user_id: int) -> tuple[bool, int]:
-        """Check if user is in cooldown. Returns (is_cooldown, seconds_remaining)."""
-        user = await self.get_user(user_id)
-        if not user or not user.cooldown_until:
+    async def get_user_state(self, user_id: int) -> tuple[str | None, bool, int]:
+        """
+        Language and cooldown in one read.
+        Returns (language, is_cooldown, seconds_remaining).
+        """
+        async with self._reader().execute(SQL_GET_LANGUAGE_COOLDOWN, (user_id,)) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return None, False, 0
+        in_cooldown, remaining = await self._cooldown_status(user_id, row["cooldown_until"])
+        return row["language"], in_cooldown, remaining
+    
+    async def _cooldown_status(self, user_id: int, cooldown_until: int | None) -> tuple[bool, int]:
+        """Evaluate cooldown_until, resetting attempts if it has expired."""
+        if not cooldown_until:
             return False, 0
         
-        now = int(time.time())
-        if now >= user.cooldown_until:
-            # Cooldown expired, reset
-            await self.reset_attempts(user_id)
+        now = _now_cached
+        if now >= cooldown_until:
+            # Cooldown expired, reset (the only path that writes)
+            await self._write(SQL_CLEAR_EXPIRED_COOLDOWN, (user_id, now))
             return False, 0
         
-        return True, user.cooldown_until - now
+        return True, cooldown_until - now
     
     # --- Settings operations ---
     
     async def get_setting(self, key: str, default: str = "") -> str:
-        """Get a setting value."""
-        async with self._conn.execute(
-            "SELECT value FROM settings WHERE key = ?", (key,)
-        ) as cursor:
-            row = await cursor.fetchone()
-            return row["value"] if row else default
+        """Get a setting value (served from the in-memory cache)."""
+        return self._settings_cache.get(key, default)
     
     async def set_setting(self, key: str, value: str) -> None:
         """Set a setting value."""
-        await self._conn.execute(
-            """INSERT INTO settings (key, value) VALUES (?, ?)
-               ON CONFLICT(key) DO UPDATE SET value = ?""",
-            (key, value, value)
-        )
-        await self._conn.commit()
+        await self._write(SQL_SET_SETTING, (key, value, value))
+        self._settings_cache[key] = value
     
     async def get_lockdown(self) -> bool:
         """Get lockdown mode status."""
@@ -265,15 +481,13 @@ class Database:
     
     async def count_verified_last_24h(self) -> int:
         """Count users verified in last 24 hours."""
-        cutoff = int(time.time()) - 86400
-        async with self._conn.execute(
-            "SELECT COUNT(*) as cnt FROM users WHERE verified_at > ?", (cutoff,)
-        ) as cursor:
+        cutoff = _now_cached - 86400
+        async with self._reader().execute(SQL_COUNT_VERIFIED_SINCE, (cutoff,)) as cursor:
             row = await cursor.fetchone()
             return row["cnt"] if row else 0
     
     async def count_total_users(self) -> int:
         """Count total users in database."""
-        async with self._conn.execute("SELECT COUNT(*) as cnt FROM users") as cursor:
+        async with self._reader().execute(SQL_COUNT_USERS) as cursor:
             row = await cursor.fetchone()
             return row["cnt"] if row else 0
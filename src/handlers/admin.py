@@ -4,7 +4,7 @@ Admin command handlers (DM only).
 import logging
 from aiogram import Router, F
 from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.filters import Command, CommandObject
 
 from src import texts
 from src.db import Database
@@ -13,6 +13,9 @@ from src.config import Config
 logger = logging.getLogger(__name__)
 router = Router(name="admin")
 
+# Only commands can match here; skip plain DMs before any Command filter runs
+router.message.filter(F.text.startswith("/"))
+
 
 async def is_admin(message: Message, config: Config) -> bool:
     """
@@ -20,68 +23,60 @@ async def is_admin(message: Message, config: Config) -> bool:
     Uses ADMIN_IDS env var as fallback.
     Could be enhanced to use getChatAdministrators API.
     """
-    user_id = message.from_user.id
-    
-    # Check env var admin list
-    if user_id in config.admin_ids:
-        return True
-    
-    # Enhancement: Could check getChatAdministrators here
-    # For v0, we rely on ADMIN_IDS
-    
-    return False
+    # ADMIN_IDS is a frozenset, so this is O(1)
+    return message.from_user.id in config.admin_ids
+
+
+# Command argument -> enabled flag
+_LOCKDOWN_ARGS = {"on": True, "off": False}
+_MODE_ARGS = {"strict": True, "soft": False}
+
+
+def _parse_flag(command: CommandObject, choices: dict[str, bool]) -> bool | None:
+    """Map the command argument to a flag, or None if missing/unknown."""
+    return choices.get((command.args or "").strip().lower())
 
 
 @router.message(Command("lockdown"))
-async def cmd_lockdown(message: Message, db: Database, config: Config) -> None:
+async def cmd_lockdown(message: Message, command: CommandObject, db: Database, config: Config) -> None:
     """Toggle lockdown mode: /lockdown on|off"""
     if not await is_admin(message, config):
         await message.answer(texts.ADMIN_NOT_AUTHORIZED)
         return
     
-    args = message.text.split(maxsplit=1)
-    if len(args) < 2:
+    enabled = _parse_flag(command, _LOCKDOWN_ARGS)
+    if enabled is None:
         await message.answer("Usage: /lockdown on|off")
         return
     
-    mode = args[1].lower().strip()
-    
-    if mode == "on":
-        await db.set_lockdown(True)
+    await db.set_lockdown(enabled)
+    if enabled:
         logger.info(f"Admin {message.from_user.id} enabled lockdown")
         await message.answer(texts.ADMIN_LOCKDOWN_ON)
-    elif mode == "off":
-        await db.set_lockdown(False)
+    else:
         logger.info(f"Admin {message.from_user.id} disabled lockdown")
         await message.answer(texts.ADMIN_LOCKDOWN_OFF)
-    else:
-        await message.answer("Usage: /lockdown on|off")
 
 
 @router.message(Command("mode"))
-async def cmd_mode(message: Message, db: Database, config: Config) -> None:
+async def cmd_mode(message: Message, command: CommandObject, db: Database, config: Config) -> None:
     """Toggle strict/soft mode: /mode soft|strict"""
     if not await is_admin(message, config):
         await message.answer(texts.ADMIN_NOT_AUTHORIZED)
         return
     
-    args = message.text.split(maxsplit=1)
-    if len(args) < 2:
+    strict = _parse_flag(command, _MODE_ARGS)
+    if strict is None:
         await message.answer("Usage: /mode soft|strict")
         return
     
-    mode = args[1].lower().strip()
-    
-    if mode == "strict":
-        await db.set_strict_mode(True)
+    await db.set_strict_mode(strict)
+    if strict:
         logger.info(f"Admin {message.from_user.id} enabled strict mode")
         await message.answer(texts.ADMIN_MODE_STRICT)
-    elif mode == "soft":
-        await db.set_strict_mode(False)
+    else:
         logger.info(f"Admin {message.from_user.id} enabled soft mode")
         await message.answer(texts.ADMIN_MODE_SOFT)
-    else:
-        await message.answer("Usage: /mode soft|strict")
 
 
 @router.message(Command("status"))
@@ -105,8 +100,7 @@ async def cmd_status(message: Message, db: Database, config: Config) -> None:
             lockdown=lockdown_str,
             verified_24h=verified_24h,
             total_users=total_users
-        ),
-        parse_mode="Markdown"
+        )
     )
 
 
@@ -117,7 +111,7 @@ async def cmd_admin_help(message: Message, config: Config) -> None:
         await message.answer(texts.ADMIN_NOT_AUTHORIZED)
         return
     
-    await message.answer(texts.ADMIN_HELP, parse_mode="Markdown")
+    await message.answer(texts.ADMIN_HELP)
 
 
 
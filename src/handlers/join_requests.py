@@ -6,7 +6,6 @@ from aiogram import Router, F
 from aiogram.types import ChatJoinRequest
 
 from src import texts
-from src.texts import get_text
 from src.db import Database
 from src.config import Config
 
@@ -33,8 +32,11 @@ async def on_join_request(request: ChatJoinRequest, db: Database, config: Config
     # Record the join request time
     await db.set_join_request_time(user_id)
     
-    # Get user's language (default to English if not set)
-    lang = await db.get_language(user_id) or "en"
+    # One read for language, verification and cooldown state
+    lang, verified_recently, in_cooldown = await db.get_join_context(
+        user_id, config.verify_ttl_seconds
+    )
+    lang = lang or "en"  # Default to English if not set
     
     # Check lockdown mode
     lockdown = await db.get_lockdown()
@@ -44,19 +46,13 @@ async def on_join_request(request: ChatJoinRequest, db: Database, config: Config
             await request.decline()
             await request.bot.send_message(
                 user_id,
-                get_text(texts.DECLINED_VERIFY_FIRST, lang),
-                parse_mode="Markdown"
+                texts.render("DECLINED_VERIFY_FIRST", lang)
             )
         except Exception as e:
             logger.warning(f"Failed to decline/DM user {user_id}: {e}")
         return
     
-    # Check if user is verified recently
-    verified_recently = await db.is_verified_recently(user_id, config.verify_ttl_seconds)
-    
-    # Check if in cooldown (shouldn't approve during cooldown)
-    in_cooldown, _ = await db.is_in_cooldown(user_id)
-    
+    # Approve only if verified recently and not in cooldown
     if verified_recently and not in_cooldown:
         # Auto-approve!
         logger.info(f"Auto-approving user {user_id}")
@@ -65,8 +61,7 @@ async def on_join_request(request: ChatJoinRequest, db: Database, config: Config
             # DM welcome message
             await request.bot.send_message(
                 user_id,
-                get_text(texts.APPROVED, lang),
-                parse_mode="Markdown"
+                texts.render("APPROVED", lang)
             )
         except Exception as e:
             logger.error(f"Failed to approve/DM user {user_id}: {e}")
@@ -81,8 +76,7 @@ async def on_join_request(request: ChatJoinRequest, db: Database, config: Config
                 await request.decline()
                 await request.bot.send_message(
                     user_id,
-                    get_text(texts.DECLINED_VERIFY_FIRST, lang),
-                    parse_mode="Markdown"
+                    texts.render("DECLINED_VERIFY_FIRST", lang)
                 )
             except Exception as e:
                 logger.warning(f"Failed to decline/DM user {user_id}: {e}")
@@ -1,171 +1,192 @@
 """
 Handlers for lobby flow: agreement, captcha, callbacks.
 """
-import time
-import random
 import logging
+import secrets
 from aiogram import Router, F
-from aiogram.types import CallbackQuery
+from aiogram.types import CallbackQuery, InlineKeyboardMarkup
 
 from src import texts, keyboards
-from src.texts import get_text
 from src.db import Database
 from src.config import Config
+from src.middlewares import CallbackSession, RateLimitMiddleware
 
 logger = logging.getLogger(__name__)
 router = Router(name="lobby")
 
-# Rate limiting: track last callback time per user
-_last_callback: dict[int, float] = {}
-CALLBACK_COOLDOWN = 0.3  # 300ms between callbacks
+# Bound on tracked users for the in-memory callback sessions
+MAX_TRACKED_USERS = 100_000
 
+# Abandoned sessions (and their challenges) expire; the answer handler
+# regenerates the challenge on a miss
+SESSION_TTL_SECONDS = 900
 
-def _check_rate_limit(user_id: int) -> bool:
-    """Check if user is spamming callbacks. Returns True if allowed."""
-    now = time.time()
-    last = _last_callback.get(user_id, 0)
-    if now - last < CALLBACK_COOLDOWN:
-        return False
-    _last_callback[user_id] = now
-    return True
+# Only lobby:* and captcha:* callbacks enter this router; others are
+# rejected by one regex match instead of a compare per handler
+router.callback_query.filter(F.data.regexp(r"^(lobby|captcha):"))
 
+# Throttle callback spam once for every handler in this router; also
+# injects the per-user `session` that holds the active captcha challenge
+router.callback_query.middleware(
+    RateLimitMiddleware(max_users=MAX_TRACKED_USERS, ttl=SESSION_TTL_SECONDS)
+)
 
-# Store active captcha challenges per user (in memory, resets on restart)
-_active_challenges: dict[int, str] = {}
+_LOBBY_PREFIX = "lobby:"
+_LOBBY_PREFIX_LEN = len(_LOBBY_PREFIX)
+_CAPTCHA_PREFIX = "captcha:"
+_CAPTCHA_PREFIX_LEN = len(_CAPTCHA_PREFIX)
+
+
+# Bound once at import; avoids random.choice's per-call len() + attribute lookups.
+# OS-backed RNG so the next challenge can't be predicted from earlier ones.
+_CHALLENGES = texts.CAPTCHA_CHALLENGES
+_N_CHALLENGES = len(_CHALLENGES)
+_randrange = secrets.SystemRandom().randrange
 
 
 def _get_random_challenge(lang: str) -> tuple[str, str]:
     """Get a random captcha challenge. Returns (challenge_text, correct_emoji)."""
-    challenge_en, challenge_ru, emoji = random.choice(texts.CAPTCHA_CHALLENGES)
-    challenge_text = challenge_en if lang == "en" else challenge_ru
-    return challenge_text, emoji
+    challenge = _CHALLENGES[_randrange(_N_CHALLENGES)]
+    challenge_text = challenge.en if lang == "en" else challenge.ru
+    return challenge_text, challenge.emoji
+
+
+async def _edit(
+    callback: CallbackQuery,
+    session: CallbackSession,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None
+) -> None:
+    """
+    Edit the lobby message, skipping the API call if it already shows
+    exactly this text and keyboard (Telegram would reject it as not modified).
+    """
+    buttons = () if reply_markup is None else tuple(
+        (button.text, button.callback_data)
+        for row in reply_markup.inline_keyboard for button in row
+    )
+    last_edit = (callback.message.message_id, hash((text, buttons)))
+    if session.last_edit == last_edit:
+        return
+    await callback.message.edit_text(text, reply_markup=reply_markup)
+    session.last_edit = last_edit
+
+
+async def _show_cooldown(callback: CallbackQuery, session: CallbackSession, lang: str, minutes: int) -> None:
+    """Replace the lobby message with the cooldown notice."""
+    await _edit(
+        callback,
+        session,
+        texts.render("CAPTCHA_COOLDOWN", lang, minutes=minutes),
+        keyboards.cooldown_keyboard(lang)
+    )
 
 
-@router.callback_query(F.data == "lobby:join")
-async def on_join(callback: CallbackQuery, db: Database) -> None:
+async def on_join(callback: CallbackQuery, db: Database, session: CallbackSession) -> None:
     """User taps Join button - show rules."""
     user_id = callback.from_user.id
     
-    if not _check_rate_limit(user_id):
-        await callback.answer()
-        return
-    
     logger.info(f"User {user_id} tapped Join")
     
-    # Get user's language
-    lang = await db.get_language(user_id) or "en"
+    # Get user's language and cooldown state
+    lang, in_cooldown, remaining = await db.get_user_state(user_id)
+    lang = lang or "en"
     
     # Check if in cooldown first
-    in_cooldown, remaining = await db.is_in_cooldown(user_id)
     if in_cooldown:
-        minutes = (remaining // 60) + 1
-        await callback.message.edit_text(
-            get_text(texts.CAPTCHA_COOLDOWN, lang).format(minutes=minutes),
-            reply_markup=keyboards.cooldown_keyboard(lang),
-            parse_mode="Markdown"
-        )
+        await _show_cooldown(callback, session, lang, (remaining // 60) + 1)
         await callback.answer()
         return
     
-    await callback.message.edit_text(
-        get_text(texts.WELCOME_RULES, lang),
-        reply_markup=keyboards.agree_keyboard(lang),
-        parse_mode="Markdown"
+    await _edit(
+        callback,
+        session,
+        texts.render("WELCOME_RULES", lang),
+        keyboards.agree_keyboard(lang)
     )
     await callback.answer()
 
 
-@router.callback_query(F.data == "lobby:agree")
-async def on_agree(callback: CallbackQuery, db: Database) -> None:
+async def on_agree(callback: CallbackQuery, db: Database, session: CallbackSession) -> None:
     """User agrees to rules - show captcha."""
     user_id = callback.from_user.id
     
-    if not _check_rate_limit(user_id):
-        await callback.answer()
-        return
-    
     logger.info(f"User {user_id} agreed to rules")
     
-    # Get user's language
-    lang = await db.get_language(user_id) or "en"
+    # Get user's language and cooldown state
+    lang, in_cooldown, remaining = await db.get_user_state(user_id)
+    lang = lang or "en"
     
     # Check cooldown
-    in_cooldown, remaining = await db.is_in_cooldown(user_id)
     if in_cooldown:
-        minutes = (remaining // 60) + 1
-        await callback.message.edit_text(
-            get_text(texts.CAPTCHA_COOLDOWN, lang).format(minutes=minutes),
-            reply_markup=keyboards.cooldown_keyboard(lang),
-            parse_mode="Markdown"
-        )
+        await _show_cooldown(callback, session, lang, (remaining // 60) + 1)
         await callback.answer()
         return
     
-    # Mark agreed
-    await db.set_agreed(user_id)
-    
-    # Generate captcha challenge
+    # Generate captcha challenge (agreed_at is saved with verified_at on success)
     challenge_text, correct_emoji = _get_random_challenge(lang)
-    _active_challenges[user_id] = correct_emoji
+    session.challenge = correct_emoji
     
-    await callback.message.edit_text(
-        get_text(texts.CAPTCHA_INTRO, lang).format(challenge=challenge_text),
-        reply_markup=keyboards.captcha_keyboard(correct_emoji),
-        parse_mode="Markdown"
+    await _edit(
+        callback,
+        session,
+        texts.render("CAPTCHA_INTRO", lang, challenge=challenge_text),
+        keyboards.captcha_keyboard(correct_emoji)
     )
     await callback.answer()
 
 
-@router.callback_query(F.data == "lobby:cancel")
-async def on_cancel(callback: CallbackQuery, db: Database) -> None:
+async def on_cancel(callback: CallbackQuery, db: Database, session: CallbackSession) -> None:
     """User cancels - show cancelled message."""
     user_id = callback.from_user.id
     
-    if not _check_rate_limit(user_id):
-        await callback.answer()
-        return
-    
     logger.info(f"User {user_id} cancelled")
     
     # Get user's language
     lang = await db.get_language(user_id) or "en"
     
     # Clear any active challenge
-    _active_challenges.pop(user_id, None)
+    session.challenge = None
     
-    await callback.message.edit_text(
-        get_text(texts.CANCELLED, lang),
-        parse_mode="Markdown"
-    )
+    await _edit(callback, session, texts.render("CANCELLED", lang))
     await callback.answer()
 
 
-@router.callback_query(F.data.startswith("captcha:"))
-async def on_captcha_answer(callback: CallbackQuery, db: Database, config: Config) -> None:
+@router.callback_query(F.data.startswith(_CAPTCHA_PREFIX))
+async def on_captcha_answer(
+    callback: CallbackQuery, db: Database, config: Config, session: CallbackSession
+) -> None:
     """User picks a captcha answer."""
     user_id = callback.from_user.id
     
-    if not _check_rate_limit(user_id):
-        await callback.answer()
-        return
-    
-    selected_emoji = callback.data.split(":", 1)[1]
-    correct_emoji = _active_challenges.get(user_id)
+    selected_emoji = callback.data[_CAPTCHA_PREFIX_LEN:]
+    correct_emoji = session.challenge
     
     logger.info(f"User {user_id} selected {selected_emoji}, correct is {correct_emoji}")
     
-    # Get user's language
-    lang = await db.get_language(user_id) or "en"
+    # Correct answer to a live challenge: no cooldown check needed, since
+    # challenges are only issued outside cooldown and dropped on entering it
+    if correct_emoji and selected_emoji == correct_emoji:
+        logger.info(f"User {user_id} passed captcha")
+        lang = await db.get_language(user_id) or "en"
+        session.challenge = None
+        await db.mark_verified(user_id)
+        
+        await _edit(
+            callback,
+            session,
+            texts.render("CAPTCHA_SUCCESS", lang, invite_link=config.join_request_invite_link)
+        )
+        await callback.answer("✅ Correct!" if lang == "en" else "✅ Верно!")
+        return
+    
+    # Get user's language and cooldown state
+    lang, in_cooldown, remaining = await db.get_user_state(user_id)
+    lang = lang or "en"
     
     # Check cooldown first
-    in_cooldown, remaining = await db.is_in_cooldown(user_id)
     if in_cooldown:
-        minutes = (remaining // 60) + 1
-        await callback.message.edit_text(
-            get_text(texts.CAPTCHA_COOLDOWN, lang).format(minutes=minutes),
-            reply_markup=keyboards.cooldown_keyboard(lang),
-            parse_mode="Markdown"
-        )
+        await _show_cooldown(callback, session, lang, (remaining // 60) + 1)
         await callback.answer()
         return
     
@@ -173,74 +194,52 @@ async def on_captcha_answer(callback: CallbackQuery, db: Database, config: Confi
     if not correct_emoji:
         # Regenerate captcha
         challenge_text, correct_emoji = _get_random_challenge(lang)
-        _active_challenges[user_id] = correct_emoji
-        await callback.message.edit_text(
-            get_text(texts.CAPTCHA_INTRO, lang).format(challenge=challenge_text),
-            reply_markup=keyboards.captcha_keyboard(correct_emoji),
-            parse_mode="Markdown"
+        session.challenge = correct_emoji
+        await _edit(
+            callback,
+            session,
+            texts.render("CAPTCHA_INTRO", lang, challenge=challenge_text),
+            keyboards.captcha_keyboard(correct_emoji)
         )
         await callback.answer("Session expired, please try again." if lang == "en" else "Сессия истекла, попробуй снова.")
         return
     
-    if selected_emoji == correct_emoji:
-        # Success!
-        logger.info(f"User {user_id} passed captcha")
-        _active_challenges.pop(user_id, None)
-        await db.set_verified(user_id)
-        
-        await callback.message.edit_text(
-            get_text(texts.CAPTCHA_SUCCESS, lang).format(invite_link=config.join_request_invite_link),
-            parse_mode="Markdown"
-        )
-        await callback.answer("✅ Correct!" if lang == "en" else "✅ Верно!")
+    # Wrong answer
+    count, cooldown_until = await db.increment_attempts(
+        user_id, config.max_attempts, config.cooldown_seconds
+    )
+    
+    if cooldown_until:
+        # Entered cooldown
+        logger.info(f"User {user_id} entered cooldown until {cooldown_until}")
+        session.challenge = None
+        await _show_cooldown(callback, session, lang, config.cooldown_seconds // 60)
+        await callback.answer("❌ Too many attempts!" if lang == "en" else "❌ Слишком много попыток!")
     else:
-        # Wrong answer
-        count, cooldown_until = await db.increment_attempts(
-            user_id, config.max_attempts, config.cooldown_seconds
-        )
+        # Can try again
+        remaining = config.max_attempts - count
+        logger.info(f"User {user_id} wrong answer, {remaining} attempts left")
         
-        if cooldown_until:
-            # Entered cooldown
-            logger.info(f"User {user_id} entered cooldown until {cooldown_until}")
-            _active_challenges.pop(user_id, None)
-            minutes = (config.cooldown_seconds // 60)
-            await callback.message.edit_text(
-                get_text(texts.CAPTCHA_COOLDOWN, lang).format(minutes=minutes),
-                reply_markup=keyboards.cooldown_keyboard(lang),
-                parse_mode="Markdown"
-            )
-            await callback.answer("❌ Too many attempts!" if lang == "en" else "❌ Слишком много попыток!")
-        else:
-            # Can try again
-            remaining = config.max_attempts - count
-            logger.info(f"User {user_id} wrong answer, {remaining} attempts left")
-            
-            # Generate new challenge
-            challenge_text, correct_emoji = _get_random_challenge(lang)
-            _active_challenges[user_id] = correct_emoji
-            
-            await callback.message.edit_text(
-                get_text(texts.CAPTCHA_WRONG, lang).format(remaining=remaining) + "\n\n" + 
-                get_text(texts.CAPTCHA_INTRO, lang).format(challenge=challenge_text),
-                reply_markup=keyboards.captcha_keyboard(correct_emoji),
-                parse_mode="Markdown"
-            )
-            await callback.answer("❌ Wrong!" if lang == "en" else "❌ Неверно!")
+        # Generate new challenge
+        challenge_text, correct_emoji = _get_random_challenge(lang)
+        session.challenge = correct_emoji
+        
+        await _edit(
+            callback,
+            session,
+            texts.render("CAPTCHA_WRONG_RETRY", lang, remaining=remaining, challenge=challenge_text),
+            keyboards.captcha_keyboard(correct_emoji)
+        )
+        await callback.answer("❌ Wrong!" if lang == "en" else "❌ Неверно!")
 
 
-@router.callback_query(F.data == "lobby:check_cooldown")
-async def on_check_cooldown(callback: CallbackQuery, db: Database) -> None:
+async def on_check_cooldown(callback: CallbackQuery, db: Database, session: CallbackSession) -> None:
     """User checks if cooldown is over."""
     user_id = callback.from_user.id
     
-    if not _check_rate_limit(user_id):
-        await callback.answer()
-        return
-    
-    # Get user's language
-    lang = await db.get_language(user_id) or "en"
-    
-    in_cooldown, remaining = await db.is_in_cooldown(user_id)
+    # Get user's language and cooldown state
+    lang, in_cooldown, remaining = await db.get_user_state(user_id)
+    lang = lang or "en"
     
     if in_cooldown:
         minutes = (remaining // 60) + 1
@@ -249,9 +248,29 @@ async def on_check_cooldown(callback: CallbackQuery, db: Database) -> None:
     else:
         # Cooldown over, show rules again
         logger.info(f"User {user_id} cooldown expired")
-        await callback.message.edit_text(
-            get_text(texts.WELCOME_RULES, lang),
-            reply_markup=keyboards.agree_keyboard(lang),
-            parse_mode="Markdown"
+        await _edit(
+            callback,
+            session,
+            texts.render("WELCOME_RULES", lang),
+            keyboards.agree_keyboard(lang)
         )
         await callback.answer("You can try again now!" if lang == "en" else "Можешь попробовать снова!")
+
+
+# lobby:<action> -> handler, resolved with one dict lookup in on_lobby_action
+_LOBBY_ACTIONS = {
+    "join": on_join,
+    "agree": on_agree,
+    "cancel": on_cancel,
+    "check_cooldown": on_check_cooldown,
+}
+
+
+@router.callback_query(F.data.startswith(_LOBBY_PREFIX))
+async def on_lobby_action(callback: CallbackQuery, db: Database, session: CallbackSession) -> None:
+    """Dispatch lobby:* buttons to their handler."""
+    handler = _LOBBY_ACTIONS.get(callback.data[_LOBBY_PREFIX_LEN:])
+    if handler is None:
+        await callback.answer()
+        return
+    await handler(callback, db, session)
@@ -7,7 +7,6 @@ from aiogram.types import Message, CallbackQuery
 from aiogram.filters import CommandStart, CommandObject
 
 from src import texts, keyboards
-from src.texts import get_text
 from src.db import Database
 from src.config import Config
 
@@ -21,37 +20,33 @@ async def start_deep_link(message: Message, command: CommandObject, db: Database
     user_id = message.from_user.id
     logger.info(f"User {user_id} started with deep link: {command.args}")
     
-    # Ensure user exists in DB
+    # Ensure user exists in DB (returns the current row)
     user = await db.ensure_user(user_id)
     
     # Check if user is already verified
-    user = await db.get_user(user_id)
-    if user and user.verified_at:
+    if user.verified_at:
         # Already verified - show welcome back with invite link
         lang = user.language or "en"
         logger.info(f"User {user_id} already verified, showing welcome back")
         await message.answer(
-            get_text(texts.WELCOME_BACK, lang).format(invite_link=config.join_request_invite_link),
-            parse_mode="Markdown"
+            texts.render("WELCOME_BACK", lang, invite_link=config.join_request_invite_link)
         )
         return
     
     # Check if user has selected a language
-    lang = await db.get_language(user_id)
+    lang = user.language
     
     if not lang:
         # Show language selection first
         await message.answer(
             texts.LANGUAGE_SELECT,
-            reply_markup=keyboards.language_keyboard(),
-            parse_mode="Markdown"
+            reply_markup=keyboards.language_keyboard()
         )
     else:
         # Language already selected, go to rules
         await message.answer(
-            get_text(texts.WELCOME_RULES, lang),
-            reply_markup=keyboards.agree_keyboard(lang),
-            parse_mode="Markdown"
+            texts.render("WELCOME_RULES", lang),
+            reply_markup=keyboards.agree_keyboard(lang)
         )
 
 
@@ -61,37 +56,33 @@ async def start_normal(message: Message, db: Database, config: Config) -> None:
     user_id = message.from_user.id
     logger.info(f"User {user_id} started normally")
     
-    # Ensure user exists in DB
-    await db.ensure_user(user_id)
+    # Ensure user exists in DB (returns the current row)
+    user = await db.ensure_user(user_id)
     
     # Check if user is already verified
-    user = await db.get_user(user_id)
-    if user and user.verified_at:
+    if user.verified_at:
         # Already verified - show welcome back with invite link
         lang = user.language or "en"
         logger.info(f"User {user_id} already verified, showing welcome back")
         await message.answer(
-            get_text(texts.WELCOME_BACK, lang).format(invite_link=config.join_request_invite_link),
-            parse_mode="Markdown"
+            texts.render("WELCOME_BACK", lang, invite_link=config.join_request_invite_link)
         )
         return
     
     # Check if user has selected a language
-    lang = await db.get_language(user_id)
+    lang = user.language
     
     if not lang:
         # Show language selection first
         await message.answer(
             texts.LANGUAGE_SELECT,
-            reply_markup=keyboards.language_keyboard(),
-            parse_mode="Markdown"
+            reply_markup=keyboards.language_keyboard()
         )
     else:
         # Language already selected, show welcome
         await message.answer(
-            get_text(texts.WELCOME_START, lang),
-            reply_markup=keyboards.join_keyboard(lang),
-            parse_mode="Markdown"
+            texts.render("WELCOME_START", lang),
+            reply_markup=keyboards.join_keyboard(lang)
         )
 
 
@@ -108,8 +99,7 @@ async def on_language_select(callback: CallbackQuery, db: Database) -> None:
     
     # Show welcome message in selected language
     await callback.message.edit_text(
-        get_text(texts.WELCOME_START, lang),
-        reply_markup=keyboards.join_keyboard(lang),
-        parse_mode="Markdown"
+        texts.render("WELCOME_START", lang),
+        reply_markup=keyboards.join_keyboard(lang)
     )
     await callback.answer()
@@ -1,13 +1,31 @@
 """
 Inline keyboard builders for the Gatekeeper bot.
+Static keyboards are memoized per language; aiogram only serializes them,
+so sharing one instance between messages is safe.
 """
-import random
+import secrets
+from functools import lru_cache
+from types import SimpleNamespace
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 from src import texts
-from src.texts import get_text
 
+# OS-backed RNG: captcha layouts must not be predictable from earlier ones
+_rand = secrets.SystemRandom()
 
+# Decoys available for each possible correct answer, computed once
+_DECOY_POOLS: dict[str, tuple[str, ...]] = {
+    emoji: tuple(d for d in texts.CAPTCHA_DECOYS if d != emoji)
+    for emoji in texts.CAPTCHA_CORRECT.union(texts.CAPTCHA_DECOYS)
+}
+
+
+def _buttons(lang: str) -> SimpleNamespace:
+    """Button labels for lang, English for unknown languages."""
+    return texts.BUTTONS.get(lang) or texts.BUTTONS["en"]
+
+
+@lru_cache(maxsize=1)
 def language_keyboard() -> InlineKeyboardMarkup:
     """Keyboard for language selection."""
     return InlineKeyboardMarkup(inline_keyboard=[
@@ -18,35 +36,38 @@ def language_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
+@lru_cache(maxsize=8)
 def join_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Keyboard for initial /start (after language selected)."""
+    buttons = _buttons(lang)
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=get_text(texts.BTN_JOIN, lang), callback_data="lobby:join")]
+        [InlineKeyboardButton(text=buttons.join, callback_data="lobby:join")]
     ])
 
 
+@lru_cache(maxsize=8)
 def agree_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Keyboard for rules agreement."""
+    buttons = _buttons(lang)
     return InlineKeyboardMarkup(inline_keyboard=[
         [
-            InlineKeyboardButton(text=get_text(texts.BTN_AGREE, lang), callback_data="lobby:agree"),
-            InlineKeyboardButton(text=get_text(texts.BTN_CANCEL, lang), callback_data="lobby:cancel"),
+            InlineKeyboardButton(text=buttons.agree, callback_data="lobby:agree"),
+            InlineKeyboardButton(text=buttons.cancel, callback_data="lobby:cancel"),
         ]
     ])
 
 
-def captcha_keyboard(correct_emoji: str) -> InlineKeyboardMarkup:
+def _build_captcha_keyboard(correct_emoji: str) -> InlineKeyboardMarkup:
     """
     Generate captcha keyboard with 4 emoji buttons.
     One is correct, three are random decoys.
     """
     # Pick 3 random decoys that aren't the correct answer
-    decoys = [e for e in texts.CAPTCHA_DECOYS if e != correct_emoji]
-    selected_decoys = random.sample(decoys, 3)
+    selected_decoys = _rand.sample(_DECOY_POOLS[correct_emoji], 3)
     
     # Combine and shuffle
     options = [correct_emoji] + selected_decoys
-    random.shuffle(options)
+    _rand.shuffle(options)
     
     # Create buttons in a single row
     buttons = [
@@ -60,15 +81,34 @@ def captcha_keyboard(correct_emoji: str) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=[buttons])
 
 
+# Pre-built captcha keyboards: CAPTCHA_VARIANTS random layouts per answer,
+# so serving one is a dict lookup + one RNG pick
+CAPTCHA_VARIANTS = 64
+_PREBUILT_CAPTCHAS: dict[str, tuple[InlineKeyboardMarkup, ...]] = {
+    emoji: tuple(_build_captcha_keyboard(emoji) for _ in range(CAPTCHA_VARIANTS))
+    for emoji in texts.CHALLENGE_EMOJIS
+}
+
+
+def captcha_keyboard(correct_emoji: str) -> InlineKeyboardMarkup:
+    """Captcha keyboard for the given answer, picked from the pre-built pool."""
+    variants = _PREBUILT_CAPTCHAS.get(correct_emoji)
+    if variants is None:
+        return _build_captcha_keyboard(correct_emoji)
+    return _rand.choice(variants)
+
+
+@lru_cache(maxsize=8)
 def try_again_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Keyboard shown after wrong captcha answer."""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=get_text(texts.BTN_TRY_AGAIN, lang), callback_data="lobby:join")]
+        [InlineKeyboardButton(text=_buttons(lang).try_again, callback_data="lobby:join")]
     ])
 
 
+@lru_cache(maxsize=8)
 def cooldown_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Keyboard shown during cooldown."""
     return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text=get_text(texts.BTN_TRY_LATER, lang), callback_data="lobby:check_cooldown")]
+        [InlineKeyboardButton(text=_buttons(lang).try_later, callback_data="lobby:check_cooldown")]
     ])
@@ -6,14 +6,24 @@ import asyncio
 import logging
 import logging.handlers
 import os
+import queue
 import signal
 import sys
 from pathlib import Path
 
+import orjson
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
 from aiogram.enums import ParseMode
-from aiogram.exceptions import TelegramNetworkError, TelegramAPIError
+from aiogram.exceptions import TelegramAPIError, TelegramUnauthorizedError
+from tenacity import (
+    RetryCallState,
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_random_exponential,
+)
 
 from src.config import load_config
 from src.db import Database
@@ -48,7 +58,15 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global flag for graceful shutdown (will be initialized in main)
+# While main() runs, the handlers above move to a background thread:
+# logger calls only enqueue, so console/file I/O and rotation never block
+# the event loop. Outside main() records go to the handlers directly.
+log_queue: queue.Queue = queue.Queue(-1)
+log_listener = logging.handlers.QueueListener(
+    log_queue, console_handler, file_handler, respect_handler_level=True
+)
+
+# Global flag for graceful shutdown (will be initialized in _run_bot)
 shutdown_event: asyncio.Event | None = None
 
 
@@ -59,7 +77,77 @@ def signal_handler(signum, frame):
         shutdown_event.set()
 
 
+# Polling retry policy: full-jitter exponential backoff, 5s base, 5 min cap
+MAX_POLLING_RETRIES = 10
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    """Retry network and transient API errors; a rejected token is fatal."""
+    return isinstance(exc, Exception) and not isinstance(exc, TelegramUnauthorizedError)
+
+
+async def _sleep_until_retry(seconds: float) -> None:
+    """Backoff sleep that wakes early if shutdown is requested."""
+    try:
+        await asyncio.wait_for(shutdown_event.wait(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+def _log_polling_retry(retry_state: RetryCallState) -> None:
+    """Log a failed polling attempt before backing off."""
+    exc = retry_state.outcome.exception()
+    logger.warning(
+        f"Polling error (retry {retry_state.attempt_number}/{MAX_POLLING_RETRIES}): {exc}. "
+        f"Retrying in {retry_state.next_action.sleep:.0f}s...",
+        exc_info=not isinstance(exc, (TelegramAPIError, ConnectionError, TimeoutError))
+    )
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_random_exponential(multiplier=5, max=300),
+    # First attempt plus MAX_POLLING_RETRIES retries
+    stop=stop_after_attempt(MAX_POLLING_RETRIES + 1),
+    sleep=_sleep_until_retry,
+    before_sleep=_log_polling_retry,
+    reraise=True,
+)
+async def _run_polling(dp: Dispatcher, bot: Bot) -> None:
+    """Long polling (no webhook), retried on failure."""
+    if shutdown_event.is_set():
+        logger.info("Shutdown requested during retry wait")
+        return
+    await dp.start_polling(
+        bot, 
+        allowed_updates=[
+            "message",
+            "callback_query", 
+            "chat_join_request"
+        ]
+    )
+
+
+def _orjson_dumps(obj) -> str:
+    """JSON dumper for the bot session (aiogram expects str, orjson returns bytes)."""
+    return orjson.dumps(obj).decode()
+
+
 async def main() -> None:
+    """Run the bot with logging handed off to the listener thread."""
+    root_logger = logging.getLogger()
+    direct_handlers = root_logger.handlers
+    root_logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+    log_listener.start()
+    try:
+        await _run_bot()
+    finally:
+        # Flush queued records, then log directly again
+        log_listener.stop()
+        root_logger.handlers = direct_handlers
+
+
+async def _run_bot() -> None:
     """Initialize and run the bot with automatic retry logic."""
     global shutdown_event
     
@@ -99,9 +187,12 @@ async def main() -> None:
                 logger.error(f"Failed to connect to database after {max_db_retries} attempts: {e}")
                 sys.exit(1)
     
-    # Initialize bot with default parse mode
+    # Initialize bot with default parse mode; orjson (de)serializes API
+    # payloads, including every reply_markup keyboard
+    session = AiohttpSession(json_loads=orjson.loads, json_dumps=_orjson_dumps)
     bot = Bot(
         token=config.bot_token,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.MARKDOWN)
     )
     
@@ -120,84 +211,17 @@ async def main() -> None:
     
     logger.info("Bot initialized, starting polling...")
     
-    # Polling with automatic retry logic
-    retry_count = 0
-    max_retries = 10
-    base_retry_delay = 5  # Start with 5 seconds
-    
-    while not shutdown_event.is_set():
-        try:
-            # Start polling (long polling, no webhook)
-            await dp.start_polling(
-                bot, 
-                allowed_updates=[
-                    "message",
-                    "callback_query", 
-                    "chat_join_request"
-                ]
-            )
-            # If polling exits normally (shouldn't happen), break
-            logger.info("Polling stopped normally")
-            break
-            
-        except (TelegramNetworkError, ConnectionError, TimeoutError) as e:
-            retry_count += 1
-            if retry_count > max_retries:
-                logger.error(f"Max retries ({max_retries}) reached. Shutting down.")
-                break
-            
-            # Exponential backoff with jitter
-            retry_delay = min(base_retry_delay * (2 ** (retry_count - 1)), 300)  # Cap at 5 minutes
-            logger.warning(
-                f"Network error (attempt {retry_count}/{max_retries}): {e}. "
-                f"Retrying in {retry_delay}s..."
-            )
-            
-            # Check if shutdown was requested during wait
-            try:
-                await asyncio.wait_for(shutdown_event.wait(), timeout=retry_delay)
-                logger.info("Shutdown requested during retry wait")
-                break
-            except asyncio.TimeoutError:
-                pass  # Continue with retry
-            
-        except TelegramAPIError as e:
-            # API errors might be permanent (e.g., invalid token)
-            logger.error(f"Telegram API error: {e}")
-            if "Unauthorized" in str(e) or "invalid" in str(e).lower():
-                logger.error("Fatal API error - check bot token. Exiting.")
-                break
-            # For other API errors, retry with backoff
-            retry_count += 1
-            if retry_count > max_retries:
-                logger.error(f"Max retries ({max_retries}) reached. Shutting down.")
-                break
-            retry_delay = min(base_retry_delay * (2 ** (retry_count - 1)), 300)
-            logger.warning(f"API error (attempt {retry_count}/{max_retries}): {e}. Retrying in {retry_delay}s...")
-            try:
-                await asyncio.wait_for(shutdown_event.wait(), timeout=retry_delay)
-                break
-            except asyncio.TimeoutError:
-                pass
-                
-        except KeyboardInterrupt:
-            logger.info("Received keyboard interrupt")
-            break
-            
-        except Exception as e:
-            # Catch-all for unexpected errors
-            logger.error(f"Unexpected error: {e}", exc_info=True)
-            retry_count += 1
-            if retry_count > max_retries:
-                logger.error(f"Max retries ({max_retries}) reached due to unexpected errors. Shutting down.")
-                break
-            retry_delay = min(base_retry_delay * (2 ** (retry_count - 1)), 300)
-            logger.warning(f"Unexpected error (attempt {retry_count}/{max_retries}). Retrying in {retry_delay}s...")
-            try:
-                await asyncio.wait_for(shutdown_event.wait(), timeout=retry_delay)
-                break
-            except asyncio.TimeoutError:
-                pass
+    try:
+        await _run_polling(dp, bot)
+        logger.info("Polling stopped normally")
+    except KeyboardInterrupt:
+        logger.info("Received keyboard interrupt")
+    except Exception as e:
+        if _is_retryable(e):
+            logger.error(f"Max retries ({MAX_POLLING_RETRIES}) reached: {e}. Shutting down.")
+        else:
+            # A rejected token is permanent
+            logger.error(f"Fatal API error - check bot token. Exiting. ({e})")
     
     # Cleanup
     logger.info("Shutting down...")
@@ -0,0 +1,65 @@
+"""
+Aiogram middlewares for the Gatekeeper bot.
+"""
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery
+from cachetools import TTLCache
+
+# Integer monotonic clock: immune to wall-clock jumps, no float math
+_monotonic_ns = time.monotonic_ns
+
+
+@dataclass(slots=True)
+class CallbackSession:
+    """In-memory per-user callback state (resets on restart)."""
+    last_cb_ns: int = 0
+    challenge: str | None = None
+    # (message_id, content hash) of the last edit, to skip no-op edits
+    last_edit: tuple[int, int] | None = None
+
+
+class RateLimitMiddleware(BaseMiddleware):
+    """
+    Drop callback queries that arrive within `cooldown_ns` of the user's
+    previous one. Throttled taps are answered (to stop the button spinner)
+    but never reach the handler.
+    
+    Allowed callbacks get the user's CallbackSession injected as `session`,
+    so the rate-limit stamp and the active captcha share one cache entry.
+    """
+    
+    def __init__(self, cooldown_ns: int = 300_000_000, max_users: int = 100_000, ttl: float = 900):
+        # Sessions of users who stopped tapping expire after `ttl` seconds
+        # instead of needing a manual sweep
+        self.cooldown_ns = cooldown_ns
+        self._sessions: TTLCache[int, CallbackSession] = TTLCache(maxsize=max_users, ttl=ttl)
+    
+    def allow(self, user_id: int) -> CallbackSession | None:
+        """Record a callback from user_id. Returns its session if allowed."""
+        now = _monotonic_ns()
+        session = self._sessions.get(user_id)
+        if session is None:
+            session = CallbackSession()
+        elif now - session.last_cb_ns < self.cooldown_ns:
+            return None
+        session.last_cb_ns = now
+        # Re-inserting refreshes the TTL, so only idle sessions expire
+        self._sessions[user_id] = session
+        return session
+    
+    async def __call__(
+        self,
+        handler: Callable[[CallbackQuery, dict[str, Any]], Awaitable[Any]],
+        event: CallbackQuery,
+        data: dict[str, Any],
+    ) -> Any:
+        session = self.allow(event.from_user.id)
+        if session is None:
+            await event.answer()
+            return None
+        data["session"] = session
+        return await handler(event, data)
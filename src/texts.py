@@ -3,10 +3,20 @@ Bilingual copy for Murkaverse Gatekeeper Bot.
 All texts are dictionaries with "en" and "ru" keys.
 Theme: dreamy, playful, light — dreams, sparkles, moons, cat paws
 """
+import sys
+from collections.abc import Mapping
+from functools import lru_cache
+from string import Formatter
+from types import MappingProxyType, SimpleNamespace
+from typing import NamedTuple
+
 
 # --- Language Selection ---
 
-LANGUAGE_SELECT = """🌙 *Welcome to Murkaverse*
+# Divider between the language halves of a bilingual message
+SEP = "\n\n━━━━━━━━━━━━\n\n"
+
+LANGUAGE_SELECT_EN = """🌙 *Welcome to Murkaverse*
 
 This is a place where dreams live,
 where symbols we often overlook appear,
@@ -18,11 +28,9 @@ for interpreting dreams, symbols,
 and gentle self-reflection.
 
 Take a step inside.
-Complete verification to join ✨
+Complete verification to join ✨"""
 
-━━━━━━━━━━━━
-
-🌙 *Добро пожаловать в Murkaverse*
+LANGUAGE_SELECT_RU = """🌙 *Добро пожаловать в Murkaverse*
 
 Здесь живут сны,
 знаки, которые мы часто не замечаем,
@@ -34,11 +42,12 @@ Murkaverse — это сообщество вокруг Мурки,
 и бережной саморефлексии.
 
 Сделай шаг внутрь.
-Пройди проверку, чтобы присоединиться ✨
+Пройди проверку, чтобы присоединиться ✨"""
 
-━━━━━━━━━━━━
+LANGUAGE_SELECT_PROMPT = "🌐 *Choose your language / Выбери язык*"
 
-🌐 *Choose your language / Выбери язык*"""
+# Shown before a language is chosen, so it carries both halves
+LANGUAGE_SELECT = SEP.join((LANGUAGE_SELECT_EN, LANGUAGE_SELECT_RU, LANGUAGE_SELECT_PROMPT))
 
 # --- Welcome & Rules ---
 
@@ -48,7 +57,7 @@ WELCOME_START = {
 Welcome to Murkaverse ✨
 
 Tap below to begin your journey.""",
-    
+
     "ru": """🌙 *Добро пожаловать в Murkaverse*
 
 Murkaverse — это сообщество вокруг Мурки,
@@ -69,7 +78,7 @@ Just a few simple rules before you enter:
 ✨ No spam or self-promo
 ✨ Keep it cozy and stick to the theme of dreams or the Murkaverse project in general
 ✨ English in General, other topics include English and Russian language versions""",
-    
+
     "ru": """🐾 *Почти все!*
 
 Несколько простых правил:
@@ -118,7 +127,7 @@ CAPTCHA_INTRO = {
 Just making sure you're a real dreamer, not a bot ✨
 
 {challenge}""",
-    
+
     "ru": """🐾 *Быстрая проверка!*
 
 Убедимся, что ты настоящий мечтатель ✨
@@ -126,17 +135,29 @@ Just making sure you're a real dreamer, not a bot ✨
 {challenge}"""
 }
 
-# Challenge templates: (english_text, russian_text, correct_emoji)
-CAPTCHA_CHALLENGES = [
-    ("Tap the moon 🌙", "Нажми на луну 🌙", "🌙"),
-    ("Tap the sparkle ✨", "Нажми на искорку ✨", "✨"),
-    ("Tap the cat paw 🐾", "Нажми на лапку 🐾", "🐾"),
-    ("Tap the star 🌟", "Нажми на звезду 🌟", "🌟"),
-    ("Tap the dream cloud 💭", "Нажми на облако 💭", "💭"),
-]
+class Challenge(NamedTuple):
+    """Captcha challenge text per language and its correct emoji."""
+    en: str
+    ru: str
+    emoji: str
+
+
+CAPTCHA_CHALLENGES: tuple[Challenge, ...] = (
+    Challenge("Tap the moon 🌙", "Нажми на луну 🌙", "🌙"),
+    Challenge("Tap the sparkle ✨", "Нажми на искорку ✨", "✨"),
+    Challenge("Tap the cat paw 🐾", "Нажми на лапку 🐾", "🐾"),
+    Challenge("Tap the star 🌟", "Нажми на звезду 🌟", "🌟"),
+    Challenge("Tap the dream cloud 💭", "Нажми на облако 💭", "💭"),
+)
+
+# Answers only, for code that never touches the challenge texts
+CHALLENGE_EMOJIS = tuple(c.emoji for c in CAPTCHA_CHALLENGES)
+
+# Every emoji that can be a correct answer
+CAPTCHA_CORRECT = frozenset(CHALLENGE_EMOJIS)
 
 # Decoy emojis (used to fill wrong answers)
-CAPTCHA_DECOYS = ["🌸", "🦋", "🍃", "☁️", "🫧", "🪷", "🌿", "🧸", "💫", "🌷", "🪻", "🐚"]
+CAPTCHA_DECOYS = ("🌸", "🦋", "🍃", "☁️", "🫧", "🪷", "🌿", "🧸", "💫", "🌷", "🪻", "🐚")
 
 CAPTCHA_SUCCESS = {
     "en": """✨ *Welcome to Murkaverse, dreamer!*
@@ -149,7 +170,7 @@ You're all set to join 🌙 Click the link below to enter the group!
 3. English in General, other topics include English and Russian language versions
 
 {invite_link}""",
-    
+
     "ru": """✨ *Добро пожаловать в Муркаверс, соня!*
 
 Присоединяйся к группе Муркаверс 🌙 Нажми на ссылку снизу, чтобы пройти в группу!
@@ -167,18 +188,24 @@ CAPTCHA_WRONG = {
 
 Try again, dreamer ✨
 Attempts left: {remaining}""",
-    
+
     "ru": """🌙 *Упс, не то!*
 
 Попробуй ещё раз!
 Осталось попыток: {remaining}"""
 }
 
+# Wrong answer + fresh challenge, pre-joined so it renders with one format()
+CAPTCHA_WRONG_RETRY = {
+    lang: CAPTCHA_WRONG[lang] + "\n\n" + CAPTCHA_INTRO[lang]
+    for lang in CAPTCHA_WRONG
+}
+
 CAPTCHA_COOLDOWN = {
     "en": """💤 *Take a little nap...*
 
 Too many tries! Wait {minutes} min and try again 🌙""",
-    
+
     "ru": """💤 *Немного подремли...*
 
 Слишком много попыток! Подожди {minutes} мин 🌙"""
@@ -190,7 +217,7 @@ CANCELLED = {
     "en": """✨ *No worries, dreamer!*
 
 Come back anytime — just tap /start""",
-    
+
     "ru": """✨ *Без проблем, возвращайся как передумаешь!*
 
 Нажми /start когда будешь готов(а)."""
@@ -207,7 +234,7 @@ Welcome to Murkaverse ✨
 🌙 Other topics include English and Russian language versions
 
 See you inside! 💫""",
-    
+
     "ru": """🐾 *Победа, проходи!*
 
 Добро пожаловать в Муркаверс ✨
@@ -226,7 +253,7 @@ DECLINED_VERIFY_FIRST = {
 Please complete the verification first ✨
 
 Tap /start to begin.""",
-    
+
     "ru": """🌙 *Секундочку!*
 
 Сначала пройди проверку ✨
@@ -265,7 +292,7 @@ WELCOME_BACK = {
 You're all set to join 🌙 Click the link below to enter the group!
 
 {invite_link}""",
-    
+
     "ru": """✨ *Добро пожаловать обратно в Murkaverse, соня!*
 
 Нажми на ссылку снизу, чтобы пройти в группу 🌙
@@ -281,10 +308,101 @@ ERROR_GENERIC = {
 }
 
 
+# Intern every text so each is stored once and compares by identity, and
+# freeze the bilingual ones: TEXTS, BUTTONS and render's cache copy them
+# at import, so they must not change afterwards
+for _name, _value in list(globals().items()):
+    if _name.startswith("_") or not _name.isupper():
+        continue
+    if isinstance(_value, str):
+        globals()[_name] = sys.intern(_value)
+    elif isinstance(_value, dict) and "en" in _value:
+        globals()[_name] = MappingProxyType({
+            lang: sys.intern(text) for lang, text in _value.items()
+        })
+del _name, _value
+
+
+class _TextTable(dict):
+    """(name, lang) -> text. Unknown languages fall back to English."""
+
+    def __missing__(self, key: tuple[str, str]) -> str:
+        name, lang = key
+        if lang == "en":
+            raise KeyError(key)
+        return self[name, "en"]
+
+
+# Flat lookup over every bilingual text above: TEXTS["WELCOME_START", lang]
+# is a single dict hit
+TEXTS: dict[tuple[str, str], str] = _TextTable(
+    ((name, lang), text)
+    for name, value in list(globals().items())
+    if isinstance(value, Mapping) and "en" in value
+    for lang, text in value.items()
+)
+
+LANGUAGES = ("en", "ru")
+
+_BILINGUAL_NAMES = tuple(dict.fromkeys(name for name, _ in TEXTS))
+
+# Button labels per language: BUTTONS["ru"].join is BTN_JOIN["ru"]
+BUTTONS: dict[str, SimpleNamespace] = {
+    lang: SimpleNamespace(**{
+        name[len("BTN_"):].lower(): TEXTS[name, lang]
+        for name in _BILINGUAL_NAMES if name.startswith("BTN_")
+    })
+    for lang in LANGUAGES
+}
+
+# Names whose text has {placeholders}; render() returns the rest unformatted
+_TEMPLATED = frozenset(name for (name, _), text in TEXTS.items() if "{" in text)
+
+
+def _compile(template: str) -> tuple[tuple[str, str | None], ...] | None:
+    """
+    Split a template into (literal, field_name) segments, parsed once.
+    Returns None for fields that need full str.format (specs, conversions,
+    indexing or positional {}).
+    """
+    segments = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        if field is not None and (spec or conversion or not field.isidentifier()):
+            return None
+        segments.append((literal, field))
+    return tuple(segments)
+
+
+# Pre-parsed segments for every templated (name, lang)
+_COMPILED = {
+    key: _compile(text) for key, text in TEXTS.items() if key[0] in _TEMPLATED
+}
+
+
 # --- Helper function ---
 
-def get_text(text_dict: dict | str, lang: str) -> str:
-    """Get text for specified language. Falls back to English if not found."""
-    if isinstance(text_dict, str):
-        return text_dict
-    return text_dict.get(lang, text_dict.get("en", ""))
+def render(name: str, lang: str, **kwargs: object) -> str:
+    """
+    Text for name in lang, the one entry point for every bilingual text.
+    Static texts come straight from TEXTS; templates get kwargs filled in.
+    """
+    if name not in _TEMPLATED:
+        return TEXTS[name, lang]
+    return _render(name, lang, tuple(sorted(kwargs.items())))
+
+
+# Template arguments take few distinct values (challenge, attempts left,
+# cooldown minutes, the invite link), so formatted results are reused
+@lru_cache(maxsize=256)
+def _render(name: str, lang: str, kwitems: tuple[tuple[str, object], ...]) -> str:
+    """Format a templated text; kwargs arrive as sorted items to be hashable."""
+    text = TEXTS[name, lang]
+    kwargs = dict(kwitems)
+    segments = _COMPILED.get((name, lang))
+    if segments is None:
+        # English fallback for an unknown lang, or a field _compile skipped
+        return text.format_map(kwargs)
+    return "".join([
+        literal if field is None else literal + str(kwargs[field])
+        for literal, field in segments
+    ])